@@ -0,0 +1,4 @@
+import logging
+
+# Library default: stay silent unless logging is configured (see app.main.configure_logging)
+logging.getLogger(__name__).addHandler(logging.NullHandler())
@@ -1,12 +1,24 @@
 # app/ai_connector.py
 
 import os
-from openai import OpenAI, OpenAIError
+import hashlib
+import logging
+from functools import lru_cache
+from cachetools import TTLCache
+from openai import AsyncOpenAI, OpenAIError
 from .database import settings # Get settings like the key file path
 
+logger = logging.getLogger(__name__)
+
 # --- OpenAI API Key Handling ---
+# The key is only looked up once per process (a missing key is cached too);
+# restart the app to pick up a new key.
+@lru_cache(maxsize=1)
 def get_openai_api_key() -> str | None:
-    """Reads the OpenAI API key from the file specified in settings."""
+    """Returns the OpenAI API key from settings (OPENAI_API_KEY) or the key file specified in settings."""
+    if settings.openai_api_key is not None:
+        return settings.openai_api_key.get_secret_value().strip() or None
+
     key_file_path = settings.openai_api_key_file
     try:
         # Ensure the path is absolute or relative to the execution dir
@@ -18,81 +30,122 @@ def get_openai_api_key() -> str | None:
         
         # Let's assume the path in .env is relative to the project root where you run uvicorn
         if not os.path.exists(key_file_path):
-             print(f"Warning: API key file not found at {key_file_path}")
+             logger.warning("API key file not found at %s", key_file_path)
              return None
              
         with open(key_file_path, 'r') as f:
             api_key = f.read().strip()
             if not api_key:
-                print(f"Warning: API key file '{key_file_path}' is empty.")
+                logger.warning("API key file '%s' is empty.", key_file_path)
                 return None
             return api_key
     except Exception as e:
-        print(f"Error reading OpenAI API key from {key_file_path}: {e}")
+        logger.error("Error reading OpenAI API key from %s: %s", key_file_path, e)
         return None
 
 # Initialize OpenAI client (only if key is available)
-# It's often better to initialize the client *when needed* rather than globally,
-# especially if the key might not be present at startup.
-def get_openai_client():
-    """Initializes and returns the OpenAI client if the key is available."""
+# The client is created once (at startup via init_client, or lazily on first use)
+# and then reused, so every request shares the same HTTP connection pool.
+# If the key is missing, that outcome is remembered too, so requests fall back
+# straight away without touching the filesystem again.
+_client: AsyncOpenAI | None = None
+_client_initialized = False
+
+def init_client() -> AsyncOpenAI | None:
+    """Creates the shared OpenAI client (or records that there is none). Called from the app lifespan."""
+    global _client, _client_initialized
     api_key = get_openai_api_key()
     if api_key:
-        return OpenAI(api_key=api_key)
+        _client = AsyncOpenAI(api_key=api_key)
     else:
-        print("OpenAI client could not be initialized: API key missing.")
-        return None
+        _client = None
+        logger.warning("OpenAI client could not be initialized: API key missing.")
+    _client_initialized = True
+    return _client
+
+def get_openai_client() -> AsyncOpenAI | None:
+    """Returns the shared AsyncOpenAI client, or None if no API key is configured."""
+    if not _client_initialized:
+        init_client()
+    return _client
+
+# --- Suggestion Cache ---
+# Suggestions are side-effect free, so identical task text can reuse a previous
+# answer instead of paying for another OpenAI round trip.
+_suggestion_cache: TTLCache = TTLCache(maxsize=10_000, ttl=3600)
+
+def _suggestion_cache_key(task_title: str, task_description: str | None) -> str:
+    """Builds a cache key from the (whitespace-normalized) task title and description."""
+    text = task_title.strip() + "\x1f" + (task_description or "").strip()
+    return hashlib.blake2b(text.encode()).hexdigest()
 
 # --- AI Suggestion Generation ---
 
 # --- Option 1: Simple Placeholder (as requested initially) ---
 # def generate_ai_suggestion_stub(task_title: str, task_description: str | None) -> str:
 #     """A simple placeholder for AI suggestions."""
-#     print(f"Generating stub suggestion for task: {task_title}")
+#     logger.info("Generating stub suggestion for task: %s", task_title)
 #     # You could make this slightly more dynamic if you wanted
 #     # suggestion = f"Consider optimizing the workflow for '{task_title}'."
 #     suggestion = "Optimize this task for better efficiency." # Fixed text
 #     return suggestion
 
 # --- Option 2: Actual OpenAI Integration ---
-def generate_ai_suggestion(task_title: str, task_description: str | None) -> str | None:
-    """Generates a suggestion for a task using the OpenAI API."""
+# Prompt pieces that never change are built once at import time.
+OPENAI_MODEL = "gpt-4o-mini" # Faster and cheaper than gpt-3.5-turbo for this short task
+OPENAI_MAX_TOKENS = 30 # The prompt asks for < 20 words, so this is plenty
+_SYSTEM_MESSAGE = {"role": "system", "content": "You are a helpful assistant providing task suggestions."}
+_PROMPT_TEMPLATE = (
+    "Provide one short, actionable suggestion (less than 20 words) to improve or clarify the following task:\n"
+    "Title: {title}\n"
+    "{description_line}"
+    "Suggestion:"
+)
+
+async def generate_ai_suggestion(task_title: str, task_description: str | None) -> str | None:
+    """
+    Generates a suggestion for a task using the OpenAI API.
+    Returns None if no suggestion could be generated (no API key, API or other error),
+    so callers can record the failure instead of storing an error message as a suggestion.
+    """
     client = get_openai_client()
     if not client:
-        # Fallback to stub if OpenAI client isn't available
-        print("OpenAI client not available, falling back to stub suggestion.")
-        return "Optimize this task for better efficiency. (AI unavailable)" 
-        # return None # Or just return None if no suggestion can be made
+        logger.debug("OpenAI client not available, no suggestion generated.")
+        return None
 
-    prompt = f"Provide one short, actionable suggestion (less than 20 words) to improve or clarify the following task:\n"
-    prompt += f"Title: {task_title}\n"
-    if task_description:
-        prompt += f"Description: {task_description}\n"
-    prompt += "Suggestion:"
+    cache_key = _suggestion_cache_key(task_title, task_description)
+    cached = _suggestion_cache.get(cache_key)
+    if cached is not None:
+        logger.debug("Using cached suggestion for task: %s", task_title)
+        return cached
 
-    print(f"Sending prompt to OpenAI for task: {task_title}")
+    prompt = _PROMPT_TEMPLATE.format(
+        title=task_title,
+        description_line=f"Description: {task_description}\n" if task_description else "",
+    )
+
+    logger.info("Sending prompt to OpenAI for task: %s", task_title)
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo", # Or another suitable model
+        response = await client.chat.completions.create(
+            model=OPENAI_MODEL,
             messages=[
-                {"role": "system", "content": "You are a helpful assistant providing task suggestions."},
+                _SYSTEM_MESSAGE,
                 {"role": "user", "content": prompt}
             ],
-            max_tokens=50, # Limit the length of the suggestion
+            max_tokens=OPENAI_MAX_TOKENS, # Limit the length of the suggestion
             n=1,           # Get just one suggestion
             stop=None,     # Let the model decide when to stop
             temperature=0.7, # A bit creative but not too random
         )
         suggestion = response.choices[0].message.content.strip()
-        print(f"Received suggestion from OpenAI: {suggestion}")
+        logger.info("Received suggestion from OpenAI: %s", suggestion)
+        # Only real answers are cached; failures should be retried next time
+        _suggestion_cache[cache_key] = suggestion
         return suggestion
     except OpenAIError as e:
-        print(f"Error calling OpenAI API: {e}")
-        # Fallback or error indication
-        return "Could not generate AI suggestion due to an API error." 
-        # return None
-    except Exception as e:
-        print(f"An unexpected error occurred during AI suggestion generation: {e}")
-        return "An unexpected error occurred while generating the suggestion."
-        # return None
\ No newline at end of file
+        logger.error("Error calling OpenAI API: %s", e)
+        return None
+    except Exception:
+        logger.exception("An unexpected error occurred during AI suggestion generation")
+        return None
\ No newline at end of file
@@ -1,30 +1,74 @@
 # app/crud.py
 
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 from . import models, schemas
 
+# Note: with AsyncSession there is no implicit lazy loading, so anything a
+# response needs must be loaded by the query that fetches it.
+
 # --- User CRUD ---
 # We don't have user routes in this example, but good to have for assignee FK
-def get_user(db: Session, user_id: int):
-    return db.query(models.User).filter(models.User.id == user_id).first()
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.get(models.User, user_id)
 
-def get_user_by_username(db: Session, username: str):
-    return db.query(models.User).filter(models.User.username == username).first()
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.scalar(select(models.User).where(models.User.username == username))
 
 # You'd add create_user, etc. here if needed
 
 # --- Task CRUD ---
-def get_task(db: Session, task_id: int):
-    # Use options to load relationships eagerly if needed frequently
-    # from sqlalchemy.orm import joinedload
-    # return db.query(models.Task).options(joinedload(models.Task.assignee), joinedload(models.Task.suggestions)).filter(models.Task.id == task_id).first()
-    return db.query(models.Task).filter(models.Task.id == task_id).first()
+# The Task response schema always includes assignee and suggestions, so load them
+# up front instead of lazily per row (avoids N+1 queries).
+# joinedload for the many-to-one assignee, selectinload for the one-to-many
+# suggestions so the JOIN doesn't multiply task rows.
+_TASK_LOAD_OPTIONS = (
+    joinedload(models.Task.assignee),
+    selectinload(models.Task.suggestions),
+)
+
+async def get_task(db: AsyncSession, task_id: int):
+    return await db.scalar(
+        select(models.Task).options(*_TASK_LOAD_OPTIONS).where(models.Task.id == task_id)
+    )
+
+async def get_tasks(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: int | None = None, status: str | None = None):
+    # Tasks are ordered by id. Pass after_id (the last id of the previous page)
+    # for keyset pagination, which stays fast for deep pages; skip/OFFSET has to
+    # walk over every skipped row.
+    # Only selects the columns needed for schemas.TaskSummary, no relationships
+    query = select(models.Task.id, models.Task.title, models.Task.status, models.Task.assignee_id)
+    if status is not None:
+        query = query.where(models.Task.status == status)
+    if after_id is not None:
+        query = query.where(models.Task.id > after_id)
+    else:
+        query = query.offset(skip)
+    result = await db.execute(query.order_by(models.Task.id).limit(limit))
+    return result.all()
+
+async def stream_tasks(db: AsyncSession, limit: int | None = None, batch_size: int = 500):
+    """Yields task rows (scalar columns only) one by one, fetching them from a server-side cursor in batches."""
+    query = (
+        select(
+            models.Task.id, models.Task.title, models.Task.description, models.Task.status,
+            models.Task.assignee_id, models.Task.created_at, models.Task.updated_at,
+        )
+        .order_by(models.Task.id)
+        .limit(limit)
+        .execution_options(yield_per=batch_size) # Keeps memory at O(batch_size)
+    )
+    result = await db.stream(query)
+    async for row in result:
+        yield row
 
-def get_tasks(db: Session, skip: int = 0, limit: int = 100):
-    # Basic pagination example (add filtering/sorting as needed)
-    return db.query(models.Task).offset(skip).limit(limit).all()
+async def get_tasks_by_ids(db: AsyncSession, task_ids: list[int]):
+    # Single IN query; relationships aren't needed by the callers of this
+    result = await db.scalars(select(models.Task).where(models.Task.id.in_(task_ids)))
+    return result.all()
 
-def create_task(db: Session, task: schemas.TaskCreate):
+async def create_task(db: AsyncSession, task: schemas.TaskCreate):
     db_task = models.Task(
         title=task.title,
         description=task.description,
@@ -32,12 +76,25 @@ def create_task(db: Session, task: schemas.TaskCreate):
         status=task.status or "pending" # Use default if not provided
     )
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task) # Get the ID and other generated values like created_at
+    # The INSERT uses RETURNING for id/created_at, and the session doesn't expire
+    # objects on commit, so no refresh SELECT is needed afterwards
+    await db.commit()
     return db_task
 
-def update_task(db: Session, task_id: int, task_update: schemas.TaskUpdate):
-    db_task = get_task(db, task_id)
+async def create_tasks(db: AsyncSession, tasks: list[schemas.TaskCreate]) -> list[int]:
+    """Inserts many tasks with a single INSERT ... RETURNING and returns their IDs (for bulk seeding)."""
+    if not tasks:
+        return []
+    result = await db.scalars(
+        insert(models.Task).returning(models.Task.id),
+        [{**task.model_dump(), "status": task.status or "pending"} for task in tasks],
+    )
+    task_ids = result.all()
+    await db.commit()
+    return list(task_ids)
+
+async def update_task(db: AsyncSession, task_id: int, task_update: schemas.TaskUpdate):
+    db_task = await get_task(db, task_id)
     if not db_task:
         return None # Task not found
 
@@ -48,25 +105,55 @@ def update_task(db: Session, task_id: int, task_update: schemas.TaskUpdate):
         setattr(db_task, key, value)
 
     db.add(db_task) # Add the existing object to the session to track changes
-    db.commit()
-    db.refresh(db_task)
+    await db.commit()
+    # Nothing is expired on commit, so reload what may have changed server-side:
+    # updated_at (onupdate) and the assignee relationship (if assignee_id changed)
+    await db.refresh(db_task, attribute_names=["assignee", "updated_at"])
     return db_task
 
-def delete_task(db: Session, task_id: int):
-    db_task = get_task(db, task_id)
+async def delete_task(db: AsyncSession, task_id: int):
+    # get_task also loads the suggestions, which the delete-orphan cascade needs
+    db_task = await get_task(db, task_id)
     if not db_task:
         return False # Indicate task not found
-    db.delete(db_task)
-    db.commit()
+    await db.delete(db_task)
+    await db.commit()
     return True # Indicate success
 
 # --- AI Suggestion CRUD ---
-def create_ai_suggestion(db: Session, suggestion: schemas.AISuggestionCreate, task_id: int):
+async def get_ai_suggestion(db: AsyncSession, suggestion_id: int):
+    return await db.get(models.AISuggestion, suggestion_id)
+
+async def create_ai_suggestion(db: AsyncSession, suggestion: schemas.AISuggestionCreate, task_id: int, status: str = "completed"):
     db_suggestion = models.AISuggestion(
         **suggestion.model_dump(), # Unpack Pydantic model fields
-        task_id=task_id
+        task_id=task_id,
+        status=status
     )
     db.add(db_suggestion)
-    db.commit()
-    db.refresh(db_suggestion)
-    return db_suggestion
\ No newline at end of file
+    await db.commit() # id/created_at already came back via RETURNING
+    return db_suggestion
+
+async def update_ai_suggestion(db: AsyncSession, suggestion_id: int, suggestion_text: str, status: str):
+    db_suggestion = await get_ai_suggestion(db, suggestion_id)
+    if not db_suggestion:
+        return None # Suggestion not found (e.g. task deleted meanwhile)
+    db_suggestion.suggestion_text = suggestion_text
+    db_suggestion.status = status
+    await db.commit()
+    return db_suggestion
+
+async def create_ai_suggestions(db: AsyncSession, suggestions: list[tuple[int, schemas.AISuggestionCreate, str]]):
+    """Inserts many suggestions (as (task_id, suggestion, status) tuples) in one statement and one commit."""
+    if not suggestions:
+        return []
+    result = await db.scalars(
+        insert(models.AISuggestion).returning(models.AISuggestion),
+        [
+            {**suggestion.model_dump(), "task_id": task_id, "status": status}
+            for task_id, suggestion, status in suggestions
+        ],
+    )
+    db_suggestions = result.all()
+    await db.commit()
+    return db_suggestions
\ No newline at end of file
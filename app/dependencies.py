@@ -1,18 +1,18 @@
 # app/dependencies.py
 
+import hmac
 from fastapi import Depends, HTTPException, status, Header
-from sqlalchemy.orm import Session
 from typing import Annotated # Preferred for Depends nowadays
 
 from .database import SessionLocal, settings
 
 # Dependency to get a DB session (moved from database.py for clarity)
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+# Expected token as bytes, computed once (compare_digest needs bytes for non-ASCII input)
+_EXPECTED_TOKEN = settings.api_auth_token.encode()
 
 # Simple API Key / Bearer Token Authentication
 async def verify_token(authorization: Annotated[str | None, Header()] = None):
@@ -34,8 +34,8 @@ async def verify_token(authorization: Annotated[str | None, Header()] = None):
         )
         
     token = parts[1]
-    # Compare with the token from our settings
-    if token != settings.api_auth_token:
+    # Compare with the token from our settings in constant time (no timing leak)
+    if not hmac.compare_digest(token.encode(), _EXPECTED_TOKEN):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
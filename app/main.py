@@ -1,40 +1,71 @@
 # app/main.py
 
+import asyncio
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from fastapi import FastAPI, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 
-from . import models, routes, crud, schemas # Import necessary modules from our app
-from .database import engine, create_db_tables, SessionLocal, get_db, settings # Import db stuff
+from . import models, routes, crud, schemas, ai_connector # Import necessary modules from our app
+from .database import engine, create_db_tables, ping_database, SessionLocal, get_db, settings # Import db stuff
 from .dependencies import verify_token # Import auth dependency if needed globally
 
+logger = logging.getLogger(__name__)
+
+
+# --- Logging Setup ---
+# Request paths only put records on a queue; a background thread (QueueListener)
+# does the formatting and the actual writing to stderr.
+# Set up/torn down by the lifespan, so each app start gets its own listener.
+def configure_logging(level: int = logging.INFO) -> tuple[QueueHandler, QueueListener]:
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = QueueListener(log_queue, stream_handler)
+    queue_handler = QueueHandler(log_queue)
+
+    app_logger = logging.getLogger("app") # Parent of all app.* module loggers
+    app_logger.setLevel(level)
+    app_logger.addHandler(queue_handler)
+    app_logger.propagate = False # Don't duplicate records into uvicorn's/root handlers
+    listener.start()
+    return queue_handler, listener
+
+def shutdown_logging(queue_handler: QueueHandler, listener: QueueListener):
+    """Flushes queued records and detaches the queue handler added by configure_logging."""
+    listener.stop()
+    app_logger = logging.getLogger("app")
+    app_logger.removeHandler(queue_handler)
+    app_logger.propagate = True # Back to the default once our handler is gone
+
 
 # --- Database Initialization ---
 # This function will attempt to create tables when the app starts.
 # In production, you'd likely use migrations (like Alembic).
-def initialize_database():
-    print("Initializing database...")
-    create_db_tables()
+async def initialize_database():
+    logger.info("Initializing database...")
+    await create_db_tables()
     # Optional: Create a default user if none exist (for testing FKs)
-    db = SessionLocal()
-    try:
-        user = crud.get_user_by_username(db, username="default_user")
-        if not user:
-            print("Creating default user 'default_user'...")
-            default_user = schemas.UserCreate(username="default_user", email="user@example.com")
-            # You would need a crud.create_user function for this
-            # crud.create_user(db, default_user) # Assume you created this function in crud.py
-            # For now, let's just create it directly if crud function isn't there
-            user_model = models.User(username="default_user", email="user@example.com")
-            db.add(user_model)
-            db.commit()
-            print("Default user created.")
-        else:
-            print("Default user already exists.")
-    except Exception as e:
-        print(f"Could not create default user: {e}") # Might fail if DB isn't ready yet
-        db.rollback() # Rollback in case of error
-    finally:
-        db.close()
+    async with SessionLocal() as db:
+        try:
+            user = await crud.get_user_by_username(db, username="default_user")
+            if not user:
+                logger.info("Creating default user 'default_user'...")
+                default_user = schemas.UserCreate(username="default_user", email="user@example.com")
+                # You would need a crud.create_user function for this
+                # await crud.create_user(db, default_user) # Assume you created this function in crud.py
+                # For now, let's just create it directly if crud function isn't there
+                user_model = models.User(username="default_user", email="user@example.com")
+                db.add(user_model)
+                await db.commit()
+                logger.info("Default user created.")
+            else:
+                logger.info("Default user already exists.")
+        except Exception as e:
+            logger.warning("Could not create default user: %s", e) # Might fail if DB isn't ready yet
+            await db.rollback() # Rollback in case of error
 
 
 # --- Lifespan Management (for setup/teardown) ---
@@ -42,24 +73,30 @@ def initialize_database():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Code to run on startup
-    print("--- Application Startup ---")
-    initialize_database()
-    print("--- Startup Complete ---")
+    queue_handler, log_listener = configure_logging()
+    logger.info("--- Application Startup ---")
+    await initialize_database()
+    ai_connector.init_client() # Read the API key and build the OpenAI client once
+    logger.info("--- Startup Complete ---")
     yield
     # Code to run on shutdown
-    print("--- Application Shutdown ---")
+    logger.info("--- Application Shutdown ---")
+    await engine.dispose() # Close pooled DB connections
+    shutdown_logging(queue_handler, log_listener) # Flush any queued log records
 
 # Create the FastAPI app instance with lifespan management
 app = FastAPI(
     title="Task Management API",
     description="API for managing tasks with AI suggestions.",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse # orjson encodes datetimes natively and writes bytes directly
 )
 
 # --- Include Routers ---
 # Include the routes defined in routes.py
 app.include_router(routes.router)
+app.include_router(routes.suggestions_router)
 
 # --- Root Endpoint (Optional) ---
 @app.get("/", tags=["Root"])
@@ -69,17 +106,17 @@ async def read_root():
 
 # --- Health Check Endpoint (Good Practice) ---
 # Unauthenticated endpoint to verify service health
+HEALTH_CHECK_DB_TIMEOUT = 0.5 # Seconds
+
 @app.get("/health", tags=["Health"])
 async def health_check():
     """Checks basic connectivity (e.g., database)."""
     try:
-        # Try to get a db session as a basic check
-        db = SessionLocal()
-        db.connection() # Try establishing connection
-        db.close()
+        # Run a SELECT 1 on a dedicated (unpooled) connection, with a short timeout
+        await asyncio.wait_for(ping_database(), timeout=HEALTH_CHECK_DB_TIMEOUT)
         db_status = "connected"
     except Exception as e:
-        print(f"Health check DB connection failed: {e}")
+        logger.warning("Health check DB connection failed: %r", e)
         db_status = "error"
         # Depending on severity, you might want to return 503 Service Unavailable
         # raise HTTPException(status_code=503, detail="Database connection failed")
@@ -90,8 +127,8 @@ async def health_check():
 # Example: Add a simple user creation endpoint (not required by task spec)
 # Needs a User model, schema, and CRUD function
 # @app.post("/users/", response_model=schemas.User, tags=["Users"])
-# def create_user_endpoint(user: schemas.UserCreate, db: Session = Depends(get_db)):
-#     db_user = crud.get_user_by_username(db, username=user.username)
+# async def create_user_endpoint(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+#     db_user = await crud.get_user_by_username(db, username=user.username)
 #     if db_user:
 #         raise HTTPException(status_code=400, detail="Username already registered")
 #     # You need to implement crud.create_user
@@ -99,6 +136,5 @@ async def health_check():
 #     # Quick hack for example:
 #     user_model = models.User(**user.model_dump())
 #     db.add(user_model)
-#     db.commit()
-#     db.refresh(user_model)
+#     await db.commit()
 #     return user_model
\ No newline at end of file
@@ -1,6 +1,6 @@
 # app/models.py
 
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index, func
 from sqlalchemy.orm import relationship
 from .database import Base # Import Base from our database setup
 
@@ -28,13 +28,18 @@ class Task(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    assignee_id = Column(Integer, ForeignKey("users.id"), nullable=True) # Can be unassigned
+    assignee_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True) # Can be unassigned
 
     # Relationship: Link back to the User model
     assignee = relationship("User", back_populates="tasks")
     # Relationship: A task can have many AI suggestions
     suggestions = relationship("AISuggestion", back_populates="task", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Supports keyset pagination of the task list, optionally filtered by status
+        Index("ix_tasks_status_id", "status", "id"),
+    )
+
     def __repr__(self):
         return f"<Task(id={self.id}, title='{self.title}')>"
 
@@ -43,6 +48,7 @@ class AISuggestion(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     suggestion_text = Column(Text, nullable=False)
+    status = Column(String, default="completed") # e.g., pending, completed, failed
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
@@ -1,12 +1,20 @@
 # app/routes.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+import asyncio
+import logging
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
 from . import crud, models, schemas, ai_connector
+from .database import SessionLocal
 from .dependencies import get_db, verify_token
 
+logger = logging.getLogger(__name__)
+
 # Create a router for tasks
 # We add the authentication dependency to the router itself, so all routes in it are protected
 router = APIRouter(
@@ -15,41 +23,69 @@ router = APIRouter(
     dependencies=[Depends(verify_token)] # Apply auth to all task routes
 )
 
+# Router for looking up suggestions directly (e.g. polling background generation)
+suggestions_router = APIRouter(
+    prefix="/suggestions",
+    tags=["Suggestions"],
+    dependencies=[Depends(verify_token)]
+)
+
+# Built once so the list endpoint reuses the compiled validator/serializer
+_task_summary_list_adapter = TypeAdapter(List[schemas.TaskSummary])
+
+# Caps concurrent OpenAI calls made by the batch endpoint (rate-limit friendly)
+_batch_suggestion_semaphore = asyncio.Semaphore(20)
+
 # POST /tasks - Create a new task
 @router.post("/", response_model=schemas.Task, status_code=status.HTTP_201_CREATED)
-def create_new_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
+async def create_new_task(task: schemas.TaskCreate, db: AsyncSession = Depends(get_db)):
     """
     Creates a new task in the system.
     Requires a valid Bearer token in the Authorization header.
     """
     # Optional: Check if assignee_id exists
     if task.assignee_id:
-        db_user = crud.get_user(db, user_id=task.assignee_id)
+        db_user = await crud.get_user(db, user_id=task.assignee_id)
         if not db_user:
             raise HTTPException(status_code=404, detail=f"Assignee user with id {task.assignee_id} not found")
             
-    created_task = crud.create_task(db=db, task=task)
-    # Eagerly load relationships for the response if not done in crud
-    db.refresh(created_task, attribute_names=['assignee', 'suggestions']) 
-    return created_task
+    created_task = await crud.create_task(db=db, task=task)
+    # Re-fetch through get_task so assignee/suggestions come back eagerly loaded
+    return await crud.get_task(db, task_id=created_task.id)
+
+# GET /tasks/export.ndjson - Stream all tasks as newline-delimited JSON
+# (declared before /{task_id} so "export.ndjson" isn't parsed as a task id)
+@router.get("/export.ndjson", response_class=StreamingResponse)
+async def export_tasks(limit: Optional[int] = Query(None, ge=1)):
+    """
+    Streams tasks (without assignee/suggestions) as NDJSON, one task per line.
+    Rows are read in batches from a server-side cursor, so memory use stays
+    constant regardless of how many tasks are exported.
+    Requires a valid Bearer token.
+    """
+    async def generate_lines():
+        # The stream outlives the request handler, so it uses its own session
+        async with SessionLocal() as db:
+            async for row in crud.stream_tasks(db, limit=limit):
+                yield orjson.dumps(row._asdict()) + b"\n"
+
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
 
 # GET /tasks/{id} - Get a specific task
 @router.get("/{task_id}", response_model=schemas.Task)
-def read_task(task_id: int, db: Session = Depends(get_db)):
+async def read_task(task_id: int, db: AsyncSession = Depends(get_db)):
     """
     Retrieves a specific task by its ID.
     Requires a valid Bearer token.
     """
-    db_task = crud.get_task(db, task_id=task_id)
+    db_task = await crud.get_task(db, task_id=task_id)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    # Ensure relationships are loaded if needed for the response model
-    # db.refresh(db_task, attribute_names=['assignee', 'suggestions']) # Not strictly needed if Task schema is setup right
     return db_task
 
 # PUT /tasks/{id} - Update an existing task
 @router.put("/{task_id}", response_model=schemas.Task)
-def update_existing_task(task_id: int, task_update: schemas.TaskUpdate, db: Session = Depends(get_db)):
+async def update_existing_task(task_id: int, task_update: schemas.TaskUpdate, db: AsyncSession = Depends(get_db)):
     """
     Updates an existing task by its ID.
     Allows partial updates (only fields provided are updated).
@@ -57,67 +93,163 @@ def update_existing_task(task_id: int, task_update: schemas.TaskUpdate, db: Sess
     """
     # Optional: Check if assignee_id exists if it's being updated
     if task_update.assignee_id is not None:
-        db_user = crud.get_user(db, user_id=task_update.assignee_id)
+        db_user = await crud.get_user(db, user_id=task_update.assignee_id)
         if not db_user:
             raise HTTPException(status_code=404, detail=f"Assignee user with id {task_update.assignee_id} not found")
             
-    updated_task = crud.update_task(db=db, task_id=task_id, task_update=task_update)
+    updated_task = await crud.update_task(db=db, task_id=task_id, task_update=task_update)
     if updated_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
         
-    # Eagerly load relationships for the response
-    db.refresh(updated_task, attribute_names=['assignee', 'suggestions']) 
+    # update_task already reloads assignee/updated_at; suggestions were loaded by get_task
     return updated_task
 
 # DELETE /tasks/{id} - Delete a task
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_existing_task(task_id: int, db: Session = Depends(get_db)):
+async def delete_existing_task(task_id: int, db: AsyncSession = Depends(get_db)):
     """
     Deletes a task by its ID.
     Requires a valid Bearer token.
     Returns 204 No Content on success.
     """
-    success = crud.delete_task(db=db, task_id=task_id)
+    success = await crud.delete_task(db=db, task_id=task_id)
     if not success:
         raise HTTPException(status_code=404, detail="Task not found")
     # No content to return, FastAPI handles the 204 status
 
+# Placeholder stored while the background task is still talking to OpenAI
+PENDING_SUGGESTION_TEXT = "Suggestion is being generated."
+# Stored (with status "failed") when no suggestion could be generated
+FAILED_SUGGESTION_TEXT = "Failed to generate AI suggestion."
+
+async def _run_and_persist_suggestion(suggestion_id: int, task_title: str, task_description: str | None):
+    """Background worker: calls OpenAI and fills in the pending suggestion row."""
+    try:
+        suggestion_text = await ai_connector.generate_ai_suggestion(
+            task_title=task_title,
+            task_description=task_description
+        )
+    except Exception:
+        logger.exception("Background suggestion generation failed for suggestion %s", suggestion_id)
+        suggestion_text = None
+
+    if suggestion_text is None:
+        suggestion_text, suggestion_status = FAILED_SUGGESTION_TEXT, "failed"
+    else:
+        suggestion_status = "completed"
+
+    if await _persist_suggestion(suggestion_id, suggestion_text, suggestion_status):
+        return
+    if suggestion_status != "failed":
+        # Saving the result failed; at least try to move the row out of "pending"
+        # so clients polling GET /suggestions/{id} can stop
+        await _persist_suggestion(suggestion_id, FAILED_SUGGESTION_TEXT, "failed")
+
+async def _persist_suggestion(suggestion_id: int, suggestion_text: str, suggestion_status: str) -> bool:
+    """Writes the final text/status of a background suggestion. Returns False (and logs) on DB errors."""
+    try:
+        # The request's session is closed by now, so use a fresh one
+        async with SessionLocal() as db:
+            await crud.update_ai_suggestion(db, suggestion_id, suggestion_text, suggestion_status)
+        return True
+    except Exception:
+        logger.exception("Could not save %s status for suggestion %s", suggestion_status, suggestion_id)
+        return False
+
 # POST /tasks/{id}/suggestions - Generate AI suggestion for a task
-@router.post("/{task_id}/suggestions", response_model=schemas.AISuggestion, status_code=status.HTTP_201_CREATED)
-def create_task_suggestion(task_id: int, db: Session = Depends(get_db)):
+@router.post("/{task_id}/suggestions", response_model=schemas.AISuggestion, status_code=status.HTTP_202_ACCEPTED)
+async def create_task_suggestion(task_id: int, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
     """
-    Generates an AI-powered suggestion for the specified task and saves it.
+    Starts generating an AI-powered suggestion for the specified task.
+    Returns 202 with a pending suggestion right away; the text is filled in by a
+    background task. Poll GET /suggestions/{id} until its status is no longer "pending".
     Requires a valid Bearer token.
     """
-    db_task = crud.get_task(db, task_id=task_id)
+    # Only title/description are needed, so skip get_task's relationship loading
+    db_task = await db.get(models.Task, task_id)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    # Call our AI connector function
-    suggestion_text = ai_connector.generate_ai_suggestion(
-        task_title=db_task.title,
-        task_description=db_task.description
-    )
+    # Save a pending suggestion so the client gets an id to poll
+    suggestion_create = schemas.AISuggestionCreate(suggestion_text=PENDING_SUGGESTION_TEXT)
+    db_suggestion = await crud.create_ai_suggestion(db=db, suggestion=suggestion_create, task_id=task_id, status="pending")
+
+    # The OpenAI call (the slow part) runs after the response is sent
+    background_tasks.add_task(_run_and_persist_suggestion, db_suggestion.id, db_task.title, db_task.description)
 
-    if suggestion_text is None:
-        raise HTTPException(status_code=500, detail="Failed to generate AI suggestion")
-
-    # Create the suggestion schema object to pass to CRUD
-    suggestion_create = schemas.AISuggestionCreate(suggestion_text=suggestion_text)
-    
-    # Save the suggestion to the database
-    db_suggestion = crud.create_ai_suggestion(db=db, suggestion=suggestion_create, task_id=task_id)
-    
     return db_suggestion
 
+# POST /tasks/suggestions:batch - Generate AI suggestions for many tasks at once
+@router.post("/suggestions:batch", response_model=List[schemas.AISuggestion], status_code=status.HTTP_201_CREATED)
+async def create_task_suggestions_batch(batch: schemas.AISuggestionBatchCreate, db: AsyncSession = Depends(get_db)):
+    """
+    Generates AI-powered suggestions for several tasks concurrently and saves them.
+    All tasks must exist, otherwise nothing is generated (404).
+    Returns one suggestion per task; tasks whose generation failed get a suggestion
+    with status "failed" instead of "completed".
+    Requires a valid Bearer token.
+    """
+    task_ids = list(dict.fromkeys(batch.task_ids)) # De-duplicate, keep request order
+    db_tasks = await crud.get_tasks_by_ids(db, task_ids)
+    # Copy out what the OpenAI calls need, then end the read transaction so the
+    # pooled connection isn't held idle-in-transaction during the fan-out
+    tasks_by_id = {db_task.id: (db_task.id, db_task.title, db_task.description) for db_task in db_tasks}
+    await db.commit()
+    missing_ids = [task_id for task_id in task_ids if task_id not in tasks_by_id]
+    if missing_ids:
+        raise HTTPException(status_code=404, detail=f"Tasks not found: {missing_ids}")
+
+    async def generate(task_title: str, task_description: str | None) -> str | None:
+        async with _batch_suggestion_semaphore:
+            return await ai_connector.generate_ai_suggestion(
+                task_title=task_title,
+                task_description=task_description
+            )
+
+    # Fan out the OpenAI calls so the batch takes ~1 round trip instead of N
+    ordered_tasks = [tasks_by_id[task_id] for task_id in task_ids]
+    suggestion_texts = await asyncio.gather(*(generate(title, description) for _, title, description in ordered_tasks))
+
+    # Tasks without a suggestion (missing key, API error) are stored as "failed"
+    # rows, so the response reports them alongside the successful ones
+    suggestions = [
+        (task_id, schemas.AISuggestionCreate(suggestion_text=suggestion_text), "completed")
+        if suggestion_text is not None
+        else (task_id, schemas.AISuggestionCreate(suggestion_text=FAILED_SUGGESTION_TEXT), "failed")
+        for (task_id, _, _), suggestion_text in zip(ordered_tasks, suggestion_texts)
+    ]
+    # Save everything with a single INSERT and a single commit
+    return await crud.create_ai_suggestions(db, suggestions)
+
 # Maybe add a GET /tasks/ endpoint later to list tasks
-@router.get("/", response_model=List[schemas.Task])
-def read_tasks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/", response_model=List[schemas.TaskSummary])
+async def read_tasks(
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[int] = None,
+    task_status: Optional[str] = Query(None, alias="status"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Retrieves a list of task summaries (id, title, status, assignee_id) ordered by id.
+    For paging, pass the last id of the previous page as after_id (preferred over skip
+    for large lists). Optionally filter by status.
+    Use GET /tasks/{id} for the full task including assignee and suggestions.
+    Requires a valid Bearer token.
+    """
+    tasks = await crud.get_tasks(db, skip=skip, limit=limit, after_id=after_id, status=task_status)
+    # Serialize directly instead of going through FastAPI's generic response encoding
+    summaries = _task_summary_list_adapter.validate_python(tasks, from_attributes=True)
+    return ORJSONResponse(_task_summary_list_adapter.dump_python(summaries, mode="json"))
+
+# GET /suggestions/{id} - Get a specific suggestion
+@suggestions_router.get("/{suggestion_id}", response_model=schemas.AISuggestion)
+async def read_suggestion(suggestion_id: int, db: AsyncSession = Depends(get_db)):
     """
-    Retrieves a list of tasks with basic pagination.
+    Retrieves a specific AI suggestion by its ID (e.g. to check a pending one).
     Requires a valid Bearer token.
     """
-    tasks = crud.get_tasks(db, skip=skip, limit=limit)
-    # Note: This might be slow if there are many tasks with many relationships.
-    # Consider a simpler response model for lists or optimize queries.
-    return tasks
\ No newline at end of file
+    db_suggestion = await crud.get_ai_suggestion(db, suggestion_id=suggestion_id)
+    if db_suggestion is None:
+        raise HTTPException(status_code=404, detail="Suggestion not found")
+    return db_suggestion
\ No newline at end of file
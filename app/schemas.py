@@ -1,6 +1,6 @@
 # app/schemas.py
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -24,9 +24,17 @@ class AISuggestionBase(BaseModel):
 class AISuggestionCreate(AISuggestionBase):
     pass # No extra fields needed for creation usually
 
+# Upper bound on tasks per batch request, so one request can't run for minutes
+MAX_SUGGESTION_BATCH_SIZE = 100
+
+class AISuggestionBatchCreate(BaseModel):
+    # IDs of the tasks to generate suggestions for
+    task_ids: List[int] = Field(min_length=1, max_length=MAX_SUGGESTION_BATCH_SIZE)
+
 class AISuggestion(AISuggestionBase):
     id: int
     task_id: int
+    status: Optional[str] = None # pending, completed or failed
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
@@ -56,4 +64,13 @@ class Task(TaskBase):
     assignee: Optional[User] = None
     suggestions: List[AISuggestion] = []
 
-    model_config = ConfigDict(from_attributes=True) # Enable ORM mode
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True) # Enable ORM mode
+
+class TaskSummary(BaseModel):
+    # Lightweight representation used for task lists (no description/relationships)
+    id: int
+    title: str
+    status: Optional[str] = None
+    assignee_id: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file